@@ -1,13 +1,29 @@
+import codecs
+import json
 from typing import List, Dict
-from fastapi import APIRouter, HTTPException, status, Query
-
-from app.schema.diary_schema import DiaryResponse, DiaryCreate, DiaryUpdate, SentimentResponse
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, status, Query
+from pydantic import ValidationError
+
+from app.core.admission import Overloaded
+from app.models.sentiment import decode_sentiment
+from app.schema.diary_schema import (
+    DiaryResponse, DiaryCreate, DiaryUpdate, SentimentResponse,
+    DiaryImportItem, DiaryImportRequest, DiaryImportResponse, MAX_IMPORT_ENTRIES
+)
 from app.services import diary_service
 
 # Router
 diary_router = APIRouter(prefix="/diaries", tags=["Diari"])
 
 
+def overloaded_exception(e: Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
 def diary_to_response(diary) -> Dict:
     return {
         "id": str(diary.id),
@@ -20,7 +36,7 @@ def diary_to_response(diary) -> Dict:
             "username": diary.user.username,
             "email": diary.user.email
         } if diary.user else None,
-        "sentiment": diary.sentiment
+        "sentiment": decode_sentiment(diary.sentiment)
     }
 
 
@@ -62,6 +78,92 @@ async def create_entry(diary_data: DiaryCreate):
         )
 
 
+async def _import_entries(user_id: str, entries: List[DiaryImportItem],
+                          background_tasks: BackgroundTasks) -> Dict:
+    try:
+        diaries = await diary_service.import_diary_entries(
+            user_id=user_id,
+            entries=[entry.dict() for entry in entries]
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Errore nell'import dei diari: {str(e)}"
+        )
+
+    # Il sentiment viene calcolato in background, a batch
+    background_tasks.add_task(diary_service.analyze_imported_entries, diaries)
+    return {"imported": len(diaries), "ids": [str(diary.id) for diary in diaries]}
+
+
+@diary_router.post("/import", status_code=status.HTTP_201_CREATED, response_model=DiaryImportResponse)
+async def import_entries(import_data: DiaryImportRequest, background_tasks: BackgroundTasks):
+    """
+    Importa in blocco una lista di diari per l'utente specificato.
+    Il sentiment dei testi viene calcolato in background.
+    """
+    return await _import_entries(import_data.user_id, import_data.entries, background_tasks)
+
+
+def _parse_ndjson_line(entries: List[DiaryImportItem], line_number: int, line: str) -> None:
+    if not line.strip():
+        return
+    if len(entries) >= MAX_IMPORT_ENTRIES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Massimo {MAX_IMPORT_ENTRIES} diari per import"
+        )
+    try:
+        entries.append(DiaryImportItem(**json.loads(line)))
+    except (ValueError, TypeError, ValidationError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Riga {line_number} non valida: {str(e)}"
+        )
+
+
+@diary_router.post("/import/ndjson", status_code=status.HTTP_201_CREATED, response_model=DiaryImportResponse)
+async def import_entries_ndjson(request: Request, background_tasks: BackgroundTasks,
+                                user_id: str = Query(..., description="ID dell'utente proprietario")):
+    """
+    Importa in blocco i diari da un corpo NDJSON (un diario JSON per riga).
+    Il corpo viene letto a pezzi e la lettura si interrompe appena si supera
+    il numero massimo di diari per import.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    entries = []
+    pending = ""
+    line_number = 0
+
+    try:
+        async for chunk in request.stream():
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                line_number += 1
+                _parse_ndjson_line(entries, line_number, line)
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Il corpo della richiesta non è testo UTF-8 valido"
+        )
+    _parse_ndjson_line(entries, line_number + 1, pending)
+
+    if not entries:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Nessun diario da importare"
+        )
+
+    return await _import_entries(user_id, entries, background_tasks)
+
+
 @diary_router.get("/{entry_id}", response_model=DiaryResponse)
 async def get_entry(entry_id: str):
     """
@@ -84,7 +186,10 @@ async def update_entry(entry_id: str, diary_data: DiaryUpdate):
     """
     update_data = diary_data.dict(exclude_unset=True)
 
-    diary = await diary_service.update_diary_entry(entry_id, update_data)
+    try:
+        diary = await diary_service.update_diary_entry(entry_id, update_data)
+    except Overloaded as e:
+        raise overloaded_exception(e)
     if not diary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -126,6 +231,8 @@ async def analyze_sentiment(text: str = Query(..., description="Testo da analizz
     try:
         result = await diary_service.sentiment_analysis(None, text)
         return result
+    except Overloaded as e:
+        raise overloaded_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
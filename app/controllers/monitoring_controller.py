@@ -0,0 +1,30 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from app.core.memory import memory_usage
+from app.core.mongo_monitoring import command_monitor, pool_monitor
+
+# Router
+monitoring_router = APIRouter(prefix="/monitoring", tags=["Monitoraggio"])
+
+
+@monitoring_router.get("/mongo", response_model=Dict[str, Any])
+async def mongo_stats():
+    """
+    Restituisce lo stato del pool di connessioni Mongo (connessioni in uso,
+    attese di checkout) e le durate dei comandi per collection.
+    """
+    return {
+        "pools": pool_monitor.snapshot(),
+        "commands": command_monitor.snapshot()
+    }
+
+
+@monitoring_router.get("/memory", response_model=Dict[str, Any])
+async def memory_stats():
+    """
+    Restituisce la memoria del worker che gestisce la richiesta
+    (RSS, PSS, parte condivisa e privata).
+    """
+    return memory_usage()
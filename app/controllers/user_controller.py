@@ -1,9 +1,10 @@
 from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from pydantic import EmailStr
 
+from app.schema.job_schema import JobResponse
 from app.schema.user_schema import UserResponse, UserCreate, UserUpdate, UserLogRequest
-from app.services import user_service
+from app.services import job_service, user_service
 
 # Router
 user_router = APIRouter(prefix="/users", tags=["Utenti"])
@@ -96,19 +97,48 @@ async def update_user(user_id: str, user_data: UserUpdate):
     }
 
 
-@user_router.delete("/{user_id}", response_model=Dict[str, str])
-async def delete_user(user_id: str):
+@user_router.delete("/{user_id}", status_code=status.HTTP_202_ACCEPTED, response_model=Dict[str, str])
+async def delete_user(user_id: str, background_tasks: BackgroundTasks):
     """
     Elimina un utente dal sistema.
+    I suoi diari vengono eliminati in background: lo stato è consultabile
+    tramite /users/jobs/{job_id}.
     """
-    success = await user_service.delete_user(user_id)
-    if not success:
+    job = await user_service.delete_user(user_id)
+    if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Utente non trovato"
         )
 
-    return {"message": "Utente eliminato correttamente"}
+    background_tasks.add_task(user_service.delete_user_diaries, job)
+    return {"message": "Utente eliminato correttamente", "job_id": str(job.id)}
+
+
+@user_router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Recupera lo stato di un job in background (es. eliminazione dei diari).
+    """
+    job = await job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job non trovato"
+        )
+
+    return {
+        "id": str(job.id),
+        "type": job.type,
+        "status": job.status,
+        "params": job.params,
+        "progress": job.progress,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
 
 
 @user_router.get("/search/{search_term}", response_model=List[UserResponse])
@@ -0,0 +1,161 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from typing import Any, Callable, Dict
+
+from app.core.metrics import admission_queue_wait, admission_rejected
+
+
+class Priority(IntEnum):
+    """
+    Classi di priorità: valori più bassi vengono serviti prima.
+    """
+    INTERACTIVE = 0  # salvataggio di un diario da parte dell'utente
+    ADHOC = 1        # analisi del sentiment su richiesta
+    BACKFILL = 2     # elaborazioni in background (es. import)
+
+
+# Quota massima della coda che ogni classe può occupare
+QUEUE_SHARE = {
+    Priority.INTERACTIVE: 1.0,
+    Priority.ADHOC: 0.5,
+    Priority.BACKFILL: 0.25,
+}
+
+
+class Overloaded(Exception):
+    """
+    Sollevata quando una richiesta non può essere ammessa entro i limiti.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Servizio sovraccarico, riprovare tra {retry_after} secondi")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Limita le esecuzioni concorrenti di un lavoro bloccante (l'inferenza)
+    e la coda di quelle in attesa.
+
+    Le esecuzioni avvengono in un pool di thread dedicato, così l'event loop
+    resta libero. Se tutti gli slot sono occupati la richiesta attende in una
+    coda a priorità, con una quota massima per classe e un tempo massimo di
+    attesa; oltre questi limiti viene rifiutata subito con Overloaded.
+    A coda piena, una richiesta più prioritaria scavalca l'ultima arrivata
+    della classe meno prioritaria in attesa.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int, queue_timeouts: Dict[Priority, float]):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeouts = queue_timeouts
+        self.running = {priority: 0 for priority in Priority}
+        self.queued = {priority: 0 for priority in Priority}
+        self._waiters = []
+        self._sequence = itertools.count()
+        # Tempo medio di esecuzione per classe: le unità di lavoro hanno dimensioni diverse
+        self._service_time = {priority: 0.0 for priority in Priority}
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="inference")
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self.running.values())
+
+    @property
+    def total_queued(self) -> int:
+        return sum(self.queued.values())
+
+    async def run(self, priority: Priority, fn: Callable, *args) -> Any:
+        """
+        Esegue fn(*args) in un thread appena c'è uno slot libero.
+
+        Raises:
+            Overloaded: se la coda è piena o l'attesa supera il limite della classe
+        """
+        await self._acquire(priority)
+
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        future = loop.run_in_executor(self._executor, fn, *args)
+        future.add_done_callback(lambda _: self._release(priority, time.perf_counter() - start))
+        # Lo slot viene liberato solo quando il thread ha finito, anche se il chiamante viene cancellato
+        return await asyncio.shield(future)
+
+    def retry_after(self, priority: Priority) -> int:
+        """
+        Stima in secondi del lavoro davanti a una richiesta della classe data:
+        le esecuzioni in corso e quelle in coda con priorità uguale o maggiore.
+        """
+        backlog = sum(self.running[p] * self._service_time[p] for p in Priority)
+        backlog += sum(self.queued[p] * self._service_time[p] for p in Priority if p <= priority)
+        return max(1, math.ceil(backlog / self.max_in_flight))
+
+    def _reject(self, priority: Priority, reason: str) -> Overloaded:
+        admission_rejected.inc(priority.name.lower(), reason)
+        return Overloaded(self.retry_after(priority))
+
+    async def _acquire(self, priority: Priority):
+        if self.in_flight < self.max_in_flight and not self.total_queued:
+            self.running[priority] += 1
+            admission_queue_wait.observe(0.0, priority.name.lower())
+            return
+
+        if self.queued[priority] >= max(1, int(self.max_queued * QUEUE_SHARE[priority])):
+            raise self._reject(priority, "queue_share")
+        if self.total_queued >= self.max_queued and not self._evict(priority):
+            raise self._reject(priority, "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        self.queued[priority] += 1
+        start = time.perf_counter()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeouts[priority])
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                waiter.cancel()
+                self.queued[priority] -= 1
+                raise self._reject(priority, "deadline")
+        except asyncio.CancelledError:
+            if not waiter.done():
+                waiter.cancel()
+                self.queued[priority] -= 1
+            elif not waiter.cancelled() and waiter.exception() is None:
+                # Lo slot era già stato assegnato: va restituito
+                self._release(priority, None)
+            raise
+
+        # Il waiter può essere stato scavalcato da una richiesta più prioritaria
+        waiter.result()
+        admission_queue_wait.observe(time.perf_counter() - start, priority.name.lower())
+
+    def _evict(self, priority: Priority) -> bool:
+        candidates = [entry for entry in self._waiters if not entry[2].done() and entry[0] > priority]
+        if not candidates:
+            return False
+        victim_priority, _, victim = max(candidates, key=lambda entry: (entry[0], entry[1]))
+        self.queued[victim_priority] -= 1
+        victim.set_exception(self._reject(victim_priority, "evicted"))
+        return True
+
+    def _release(self, priority: Priority, duration):
+        self.running[priority] -= 1
+        if duration is not None:
+            previous = self._service_time[priority]
+            self._service_time[priority] = duration if not previous else 0.8 * previous + 0.2 * duration
+
+        # Passa lo slot al primo waiter ancora in attesa
+        while self._waiters:
+            priority, _, waiter = heapq.heappop(self._waiters)
+            if waiter.done():
+                continue
+            self.queued[priority] -= 1
+            self.running[priority] += 1
+            waiter.set_result(None)
+            return
@@ -0,0 +1,80 @@
+import os
+from typing import Any, Dict, Optional
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return int(value)
+
+
+class Settings:
+    """
+    Configurazione dell'applicazione letta dalle variabili d'ambiente.
+    """
+
+    def __init__(self):
+        # Connessione
+        self.mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+        self.db_name = os.getenv("MONGO_DB_NAME", "DiaryAI")
+        self.mongo_app_name = os.getenv("MONGO_APP_NAME") or None
+
+        # Pool di connessioni. Le opzioni Mongo non impostate restano None,
+        # così valgono quelle scritte in MONGO_URI o i default di pymongo
+        self.mongo_max_pool_size = _env_int("MONGO_MAX_POOL_SIZE", None)
+        self.mongo_min_pool_size = _env_int("MONGO_MIN_POOL_SIZE", None)
+        self.mongo_max_connecting = _env_int("MONGO_MAX_CONNECTING", None)
+        self.mongo_max_idle_time_ms = _env_int("MONGO_MAX_IDLE_TIME_MS", None)
+        self.mongo_wait_queue_timeout_ms = _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", None)
+
+        # Timeout
+        self.mongo_server_selection_timeout_ms = _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", None)
+        self.mongo_connect_timeout_ms = _env_int("MONGO_CONNECT_TIMEOUT_MS", None)
+        self.mongo_socket_timeout_ms = _env_int("MONGO_SOCKET_TIMEOUT_MS", None)
+
+        # Replica set
+        self.mongo_read_preference = os.getenv("MONGO_READ_PREFERENCE") or None
+        self.mongo_compressors = os.getenv("MONGO_COMPRESSORS") or None
+
+        # Modello di sentiment (nome su Hugging Face Hub o cartella locale)
+        self.sentiment_model = os.getenv("SENTIMENT_MODEL", "MilaNLProc/feel-it-italian-emotion")
+
+        # Controllo di ammissione per l'inferenza. Ogni inferenza usa già più
+        # thread di torch, quindi di default ne viene eseguita una alla volta
+        self.inference_max_in_flight = _env_int("INFERENCE_MAX_IN_FLIGHT", 1)
+        self.inference_max_queued = _env_int("INFERENCE_MAX_QUEUED", 32)
+        self.inference_queue_timeout_interactive_ms = _env_int("INFERENCE_QUEUE_TIMEOUT_INTERACTIVE_MS", 2000)
+        self.inference_queue_timeout_adhoc_ms = _env_int("INFERENCE_QUEUE_TIMEOUT_ADHOC_MS", 1000)
+        self.inference_queue_timeout_backfill_ms = _env_int("INFERENCE_QUEUE_TIMEOUT_BACKFILL_MS", 30000)
+
+        # Eliminazione a blocchi dei diari di un utente
+        self.user_delete_batch_size = _env_int("USER_DELETE_BATCH_SIZE", 500)
+        self.user_delete_batch_pause_ms = _env_int("USER_DELETE_BATCH_PAUSE_MS", 50)
+        # I job di eliminazione fermi da più di questo tempo vengono ripresi
+        self.user_delete_job_stale_after_ms = _env_int("USER_DELETE_JOB_STALE_AFTER_MS", 60000)
+        self.user_delete_job_check_interval_ms = _env_int("USER_DELETE_JOB_CHECK_INTERVAL_MS", 30000)
+
+    def mongo_client_options(self) -> Dict[str, Any]:
+        """
+        Opzioni da passare ad AsyncMongoClient; quelle non impostate
+        vengono omesse, perché pymongo darebbe loro la precedenza sulle
+        opzioni dell'URI.
+        """
+        options = {
+            "appname": self.mongo_app_name,
+            "maxPoolSize": self.mongo_max_pool_size,
+            "minPoolSize": self.mongo_min_pool_size,
+            "maxConnecting": self.mongo_max_connecting,
+            "maxIdleTimeMS": self.mongo_max_idle_time_ms,
+            "waitQueueTimeoutMS": self.mongo_wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": self.mongo_server_selection_timeout_ms,
+            "connectTimeoutMS": self.mongo_connect_timeout_ms,
+            "socketTimeoutMS": self.mongo_socket_timeout_ms,
+            "readPreference": self.mongo_read_preference,
+            "compressors": self.mongo_compressors,
+        }
+        return {k: v for k, v in options.items() if v is not None}
+
+
+settings = Settings()
@@ -0,0 +1,37 @@
+import os
+from typing import Dict
+
+
+def memory_usage() -> Dict[str, float]:
+    """
+    Memoria del processo corrente in MB, letta da /proc (solo Linux).
+
+    Oltre all'RSS riporta la PSS (memoria condivisa divisa tra i processi
+    che la usano) e le parti condivise/private: con più worker creati con
+    fork, la memoria del modello resta condivisa finché nessuno la modifica.
+    """
+    usage = {"pid": os.getpid()}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+        usage.update({
+            "rss_mb": fields.get("Rss", 0.0),
+            "pss_mb": fields.get("Pss", 0.0),
+            "shared_mb": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+            "private_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        })
+    except OSError:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        usage["rss_mb"] = pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    return usage
+
+
+def format_memory(usage: Dict[str, float]) -> str:
+    return " ".join(
+        f"{key[:-3]}={value:.1f}MB" for key, value in usage.items() if key.endswith("_mb")
+    )
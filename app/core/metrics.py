@@ -0,0 +1,261 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Bucket di default (in secondi) per le latenze
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def _join_labels(*parts: str) -> str:
+    return ",".join(part for part in parts if part)
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Series:
+    __slots__ = ("labels", "counts", "sum")
+
+    def __init__(self, labels: str, size: int):
+        self.labels = labels
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class Histogram:
+    """
+    Istogramma in formato Prometheus con bucket fissi.
+
+    I contatori di ogni combinazione di label vengono allocati alla prima
+    osservazione; le successive incrementano solo un elemento della lista.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(
+                    labels,
+                    _Series(_format_labels(self.label_names, labels), len(self.buckets) + 1)
+                )
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series.counts[index] += 1
+            series.sum += value
+
+    def totals(self, *labels: str) -> Tuple[int, float]:
+        """
+        Restituisce numero di osservazioni e somma per una combinazione di label.
+        """
+        series = self._series.get(labels)
+        if series is None:
+            return 0, 0.0
+        with self._lock:
+            return sum(series.counts), series.sum
+
+    def render(self, constant_labels: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(s.labels, list(s.counts), s.sum) for s in self._series.values()]
+
+        for labels, counts, total_sum in snapshot:
+            labels = _join_labels(constant_labels, labels)
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format_value(bound)}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class Counter:
+    """
+    Contatore monotono in formato Prometheus.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self, constant_labels: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = list(self._values.items())
+        for labels, value in snapshot:
+            formatted = _join_labels(constant_labels, _format_labels(self.label_names, labels))
+            suffix = f"{{{formatted}}}" if formatted else ""
+            lines.append(f"{self.name}{suffix} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """
+    Gauge i cui valori vengono letti da una funzione al momento dello scrape.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def render(self, constant_labels: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.collect():
+            formatted = _join_labels(constant_labels, _format_labels(self.label_names, labels))
+            suffix = f"{{{formatted}}}" if formatted else ""
+            lines.append(f"{self.name}{suffix} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    """
+    Insieme delle metriche esposte su /metrics.
+
+    Le constant_labels vengono aggiunte a ogni serie: con più worker che
+    condividono la porta (app.serve) ogni scrape arriva a un worker diverso,
+    e la label worker tiene separati i loro contatori.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.constant_labels: Dict[str, str] = {}
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        constant_labels = _format_labels(tuple(self.constant_labels), tuple(self.constant_labels.values()))
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render(constant_labels))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Latenza delle richieste HTTP per route",
+    ("method", "route", "status")
+))
+
+mongo_command_duration = registry.register(Histogram(
+    "mongo_command_duration_seconds",
+    "Durata dei comandi Mongo per comando e collection",
+    ("command", "collection")
+))
+
+mongo_checkout_wait = registry.register(Histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Attesa per ottenere una connessione dal pool Mongo",
+    ("address",)
+))
+
+sentiment_stage_duration = registry.register(Histogram(
+    "sentiment_stage_duration_seconds",
+    "Durata delle fasi dell'analisi del sentiment",
+    ("stage",)
+))
+
+sentiment_chunks = registry.register(Histogram(
+    "sentiment_chunks_per_text",
+    "Numero di chunk analizzati per ogni testo",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+))
+
+admission_queue_wait = registry.register(Histogram(
+    "inference_admission_queue_wait_seconds",
+    "Attesa in coda prima dell'inferenza per classe di priorità",
+    ("priority",)
+))
+
+admission_rejected = registry.register(Counter(
+    "inference_admission_rejected_total",
+    "Richieste di inferenza rifiutate per classe di priorità e motivo",
+    ("priority", "reason")
+))
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI che misura la latenza di ogni richiesta HTTP.
+
+    La label route usa il path template (es. /diaries/{entry_id}) per
+    non creare una serie per ogni ID. La durata viene registrata all'invio
+    dell'ultima parte della risposta, quindi esclude i BackgroundTasks che
+    Starlette esegue dopo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            recorded = True
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code)
+            )
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Se la risposta non è stata completata (es. eccezione) registra comunque la durata
+            if not recorded:
+                record()
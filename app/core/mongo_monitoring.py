@@ -0,0 +1,186 @@
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+from pymongo import monitoring
+from pymongo.common import MAX_POOL_SIZE
+
+from app.core.metrics import Gauge, mongo_checkout_wait, mongo_command_duration, registry
+
+# Numero di attese di checkout recenti usate per calcolare i percentili
+RECENT_WAIT_SAMPLES = 1024
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(fraction * len(ordered)))
+    return ordered[index]
+
+
+class _PoolStats:
+    def __init__(self, max_pool_size: int = MAX_POOL_SIZE):
+        self.max_pool_size = max_pool_size
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent_waits = deque(maxlen=RECENT_WAIT_SAMPLES)
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = list(self.recent_waits)
+        return {
+            "max_pool_size": self.max_pool_size,
+            "open_connections": self.open,
+            "in_use_connections": self.in_use,
+            "waiting_checkouts": self.waiting,
+            "checkouts": self.checkouts,
+            "checkout_failures": dict(self.checkout_failures),
+            "checkout_wait_avg_ms": (self.wait_total / self.checkouts * 1000) if self.checkouts else 0.0,
+            "checkout_wait_max_ms": self.wait_max * 1000,
+            "checkout_wait_p50_ms": _percentile(samples, 0.50) * 1000,
+            "checkout_wait_p95_ms": _percentile(samples, 0.95) * 1000,
+            "checkout_wait_p99_ms": _percentile(samples, 0.99) * 1000,
+        }
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Tiene traccia, per ogni server, delle connessioni aperte e in uso
+    e dei tempi di attesa per ottenere una connessione dal pool.
+    """
+
+    def __init__(self):
+        self.pools: Dict[str, _PoolStats] = {}
+
+    def _stats(self, address) -> _PoolStats:
+        key = f"{address[0]}:{address[1]}"
+        stats = self.pools.get(key)
+        if stats is None:
+            stats = self.pools[key] = _PoolStats()
+        return stats
+
+    def pool_created(self, event):
+        # event.options contiene solo le opzioni diverse dal default
+        self._stats(event.address).max_pool_size = event.options.get("maxPoolSize", MAX_POOL_SIZE)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        self.pools.pop(f"{event.address[0]}:{event.address[1]}", None)
+
+    def connection_created(self, event):
+        self._stats(event.address).open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        stats = self._stats(event.address)
+        stats.open = max(0, stats.open - 1)
+
+    def connection_check_out_started(self, event):
+        self._stats(event.address).waiting += 1
+
+    def connection_check_out_failed(self, event):
+        stats = self._stats(event.address)
+        stats.waiting = max(0, stats.waiting - 1)
+        reason = str(event.reason)
+        stats.checkout_failures[reason] = stats.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        stats = self._stats(event.address)
+        stats.waiting = max(0, stats.waiting - 1)
+        stats.in_use += 1
+        stats.checkouts += 1
+        duration = event.duration or 0.0
+        stats.wait_total += duration
+        stats.wait_max = max(stats.wait_max, duration)
+        stats.recent_waits.append(duration)
+        mongo_checkout_wait.observe(duration, f"{event.address[0]}:{event.address[1]}")
+
+    def connection_checked_in(self, event):
+        stats = self._stats(event.address)
+        stats.in_use = max(0, stats.in_use - 1)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {address: stats.snapshot() for address, stats in self.pools.items()}
+
+    def saturation(self) -> float:
+        """
+        Occupazione del pool più carico (0-1); 1 anche se ci sono richieste in attesa.
+        """
+        saturation = 0.0
+        for stats in self.pools.values():
+            if stats.waiting:
+                return 1.0
+            if stats.max_pool_size:
+                saturation = max(saturation, stats.in_use / stats.max_pool_size)
+        return saturation
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """
+    Raccoglie numero e durata dei comandi Mongo per comando e collection.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[Any, int], str] = {}
+        self.commands: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        self._pending[(event.connection_id, event.request_id)] = collection
+
+    def _finished(self, event, failed: bool):
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        key = (event.command_name, collection)
+        stats = self.commands.get(key)
+        if stats is None:
+            stats = self.commands[key] = {"count": 0, "failures": 0, "total_ms": 0.0, "max_ms": 0.0}
+        duration_ms = event.duration_micros / 1000
+        stats["count"] += 1
+        stats["failures"] += int(failed)
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        mongo_command_duration.observe(duration_ms / 1000, event.command_name, collection)
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {"command": command, "collection": collection, **stats}
+            for (command, collection), stats in self.commands.items()
+        ]
+
+
+pool_monitor = PoolMonitor()
+command_monitor = CommandMonitor()
+
+
+def _pool_gauge(name: str, documentation: str, field: str) -> Gauge:
+    return registry.register(Gauge(
+        name,
+        documentation,
+        ("address",),
+        lambda: [((address,), getattr(stats, field)) for address, stats in pool_monitor.pools.items()]
+    ))
+
+
+_pool_gauge("mongo_pool_open_connections", "Connessioni aperte nel pool Mongo", "open")
+_pool_gauge("mongo_pool_in_use_connections", "Connessioni del pool Mongo attualmente in uso", "in_use")
+_pool_gauge("mongo_pool_waiting_checkouts", "Richieste in attesa di una connessione dal pool", "waiting")
+_pool_gauge("mongo_pool_max_size", "Dimensione massima del pool Mongo", "max_pool_size")
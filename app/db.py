@@ -2,11 +2,11 @@ from pymongo import AsyncMongoClient
 from bson import ObjectId
 from beanie import init_beanie
 
+from app.core.config import settings
+from app.core.mongo_monitoring import command_monitor, pool_monitor
 from app.models.user import User
 from app.models.diary import Diary
-
-MONGO_URI = "mongodb://localhost:27017"
-DB_NAME = "DiaryAI"
+from app.models.job import Job
 
 client: AsyncMongoClient | None = None
 db = None
@@ -14,10 +14,14 @@ db = None
 
 async def connect_to_mongo():
     global client, db
-    client = AsyncMongoClient(MONGO_URI)
-    db = client[DB_NAME]
-
-    await init_beanie(database=db, document_models=[User, Diary])
+    client = AsyncMongoClient(
+        settings.mongo_uri,
+        event_listeners=[pool_monitor, command_monitor],
+        **settings.mongo_client_options()
+    )
+    db = client[settings.db_name]
+
+    await init_beanie(database=db, document_models=[User, Diary, Job])
 
     print("✅ Connected to Mongo")
 
@@ -1,17 +1,27 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from scalar_fastapi import get_scalar_api_reference
 
 from app.controllers.diary_controller import diary_router
+from app.controllers.monitoring_controller import monitoring_router
 from app.controllers.user_controller import user_router
+from app.core.metrics import MetricsMiddleware, registry
 from app.db import close_mongo_connection, connect_to_mongo
+from app.services import user_service
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    # Riprende le eliminazioni di utenti interrotte da un riavvio
+    job_resumer = asyncio.create_task(user_service.resume_delete_user_jobs())
     yield
+    job_resumer.cancel()
+    with suppress(asyncio.CancelledError):
+        await job_resumer
     await close_mongo_connection()
 
 
@@ -22,8 +32,11 @@ app = FastAPI(
     redoc_url=None,
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(user_router)
 app.include_router(diary_router)
+app.include_router(monitoring_router)
 
 
 @app.get("/docs", include_in_schema=False)
@@ -31,4 +44,12 @@ async def scalar_docs():
     return get_scalar_api_reference(
         openapi_url="/openapi.json",
         title="DiaryAI API Docs",
-    )
\ No newline at end of file
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
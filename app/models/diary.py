@@ -1,8 +1,10 @@
 from beanie import Document, Link
+from pymongo import ASCENDING, IndexModel
 from pydantic import EmailStr
-from typing import Optional
+from typing import Optional, Union
 from datetime import datetime
 
+from app.models.sentiment import CompactSentiment
 from app.models.user import User
 
 class Diary(Document):
@@ -11,4 +13,12 @@ class Diary(Document):
     created_at: datetime
     updated_at: datetime
     text: str
-    sentiment: Optional[dict] = None
+    # I diari salvati prima del formato compatto contengono ancora il dizionario
+    sentiment: Optional[Union[CompactSentiment, dict]] = None
+
+    class Settings:
+        # Diari di un utente in ordine di _id: usato dalle query per utente
+        # e dall'eliminazione a blocchi dei diari
+        indexes = [
+            IndexModel([("user.$id", ASCENDING), ("_id", ASCENDING)])
+        ]
@@ -0,0 +1,16 @@
+from beanie import Document
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+
+class Job(Document):
+    type: str
+    status: str = "pending"
+    params: Dict[str, Any] = {}
+    progress: Dict[str, Any] = {}
+    error: Optional[str] = None
+    # Numero di volte in cui il job è stato ripreso dopo un errore o un'interruzione
+    attempts: int = 0
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
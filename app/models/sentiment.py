@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from pydantic import BaseModel
+
+# Ordine delle etichette per ogni versione del formato compatto.
+# La versione 1 segue l'id2label di MilaNLProc/feel-it-italian-emotion.
+SENTIMENT_LABELS = {
+    1: ("anger", "fear", "joy", "sadness"),
+}
+SENTIMENT_VERSION = 1
+
+
+class CompactSentiment(BaseModel):
+    """
+    Sentiment salvato nel diario in forma compatta: gli score sono un array
+    float32 (salvato come BSON binary) nell'ordine fisso delle etichette
+    della versione, top è l'indice dell'etichetta con score più alto.
+    """
+    v: int = SENTIMENT_VERSION
+    top: int
+    scores: bytes
+
+    def vector(self) -> np.ndarray:
+        return np.frombuffer(self.scores, dtype="<f4")
+
+
+def encode_sentiment(result: Dict[str, Any]) -> CompactSentiment:
+    """
+    Converte il risultato di sentiment_analysis nel formato compatto.
+    """
+    labels = SENTIMENT_LABELS[SENTIMENT_VERSION]
+    scores = np.zeros(len(labels), dtype="<f4")
+    for item in result["sentiments"]:
+        scores[labels.index(item["label"].lower())] = item["score"]
+    return CompactSentiment(top=int(scores.argmax()), scores=scores.tobytes())
+
+
+def decode_sentiment(sentiment: Union[CompactSentiment, Dict, None]) -> Optional[Dict[str, Any]]:
+    """
+    Converte il sentiment salvato nel formato restituito dall'API
+    (sentiment, score, sentiments). I diari salvati prima del formato
+    compatto contengono già quel dizionario e vengono restituiti così.
+    """
+    if sentiment is None or isinstance(sentiment, dict):
+        return sentiment
+
+    labels = SENTIMENT_LABELS[sentiment.v]
+    scores = sentiment.vector()
+    order = np.argsort(-scores, kind="stable")
+    return {
+        "sentiment": labels[sentiment.top],
+        "score": float(scores[sentiment.top]),
+        "sentiments": [{"label": labels[i], "score": float(scores[i])} for i in order]
+    }
+
+
+def sentiment_matrix(sentiments: Sequence[Union[CompactSentiment, Dict, None]]) -> np.ndarray:
+    """
+    Impila i sentiment di più diari in una matrice (diari x etichette) nell'ordine
+    della versione corrente. I diari senza sentiment hanno una riga di zeri.
+    """
+    labels = SENTIMENT_LABELS[SENTIMENT_VERSION]
+    matrix = np.zeros((len(sentiments), len(labels)), dtype=np.float32)
+    for row, sentiment in enumerate(sentiments):
+        if isinstance(sentiment, CompactSentiment) and sentiment.v == SENTIMENT_VERSION:
+            matrix[row] = sentiment.vector()
+        elif sentiment is not None:
+            matrix[row] = _legacy_vector(decode_sentiment(sentiment), labels)
+    return matrix
+
+
+def _legacy_vector(sentiment: Dict, labels: Sequence[str]) -> List[float]:
+    vector = [0.0] * len(labels)
+    items = sentiment.get("sentiments", []) if isinstance(sentiment, dict) else []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        label = str(item.get("label", "")).lower()
+        if label in labels:
+            vector[labels.index(label)] = float(item.get("score", 0.0))
+    return vector
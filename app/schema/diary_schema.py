@@ -1,6 +1,10 @@
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
+
+# Numero massimo di diari accettati in una singola richiesta di import
+MAX_IMPORT_ENTRIES = 5000
 
 # Definizione dei modelli di richiesta/risposta
 class DiaryCreate(BaseModel):
@@ -13,6 +17,22 @@ class DiaryUpdate(BaseModel):
     text: Optional[str] = None
 
 
+class DiaryImportItem(BaseModel):
+    title: str
+    text: str = ""
+    created_at: Optional[datetime] = None
+
+
+class DiaryImportRequest(BaseModel):
+    user_id: str
+    entries: List[DiaryImportItem] = Field(..., max_length=MAX_IMPORT_ENTRIES)
+
+
+class DiaryImportResponse(BaseModel):
+    imported: int
+    ids: List[str]
+
+
 class UserShortResponse(BaseModel):
     id: str
     username: str
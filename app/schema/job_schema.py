@@ -0,0 +1,17 @@
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+
+# Definizione dei modelli di risposta
+class JobResponse(BaseModel):
+    id: str
+    type: str
+    status: str
+    params: Dict[str, Any]
+    progress: Dict[str, Any]
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: str
+    updated_at: str
+    finished_at: Optional[str] = None
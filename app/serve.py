@@ -0,0 +1,153 @@
+"""
+Avvio dell'API con più worker che condividono il modello di sentiment.
+
+Il modello viene caricato una sola volta nel processo padre, poi i worker
+vengono creati con fork: le pagine dei pesi restano condivise copy-on-write
+invece di essere duplicate in ogni worker come con ``uvicorn --workers``
+(che avvia processi nuovi e ricarica il modello in ognuno).
+
+Esempio:
+    python -m app.serve --workers 4 --host 0.0.0.0 --port 8000
+
+Ogni worker tiene le proprie metriche: su /metrics le serie hanno la label
+worker (il pid), perché ogni scrape viene servito da un worker diverso.
+Per i totali aggregare con sum without (worker).
+
+Solo Linux/macOS (richiede os.fork).
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+from app.core.memory import format_memory, memory_usage
+
+# Valore originale di TOKENIZERS_PARALLELISM, ripristinato nei worker dopo il fork
+_tokenizers_parallelism = os.environ.get("TOKENIZERS_PARALLELISM")
+
+
+def preload_model():
+    """
+    Carica l'app (e quindi il modello) e la prepara per essere condivisa.
+    """
+    # Il tokenizer Rust non deve avviare thread prima del fork
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    from app.main import app
+    from app.services import diary_service
+
+    # I pesi non richiedono gradienti e la pipeline esegue il forward senza
+    # calcolarli: non vengono mai scritti, quindi le loro pagine restano
+    # condivise tra padre e worker
+    model = diary_service.emotion_pipeline.model
+    model.eval()
+    for parameter in model.parameters():
+        parameter.requires_grad_(False)
+
+    # Sposta gli oggetti già creati fuori dal garbage collector, così le
+    # raccolte nei worker non ne toccano le pagine
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def run_worker(app, sock: socket.socket, options):
+    import torch
+    import uvicorn
+    from app.core.metrics import registry
+
+    # Dopo il fork il tokenizer può di nuovo usare i suoi thread
+    if _tokenizers_parallelism is None:
+        os.environ.pop("TOKENIZERS_PARALLELISM", None)
+    else:
+        os.environ["TOKENIZERS_PARALLELISM"] = _tokenizers_parallelism
+
+    torch.set_num_threads(options.torch_threads)
+
+    # Ogni worker ha le sue metriche: la label worker le distingue su /metrics
+    registry.constant_labels["worker"] = str(os.getpid())
+    print(f"👷 Worker {os.getpid()} avviato: {format_memory(memory_usage())}")
+
+    config = uvicorn.Config(app, log_level=options.log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Avvia DiaryAI con il modello precaricato e condiviso tra i worker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--torch-threads", type=int, default=0,
+                        help="Thread di torch per worker (default: core / worker)")
+    parser.add_argument("--log-level", default="info")
+    options = parser.parse_args(argv)
+    if not options.torch_threads:
+        options.torch_threads = max(1, (os.cpu_count() or 1) // options.workers)
+
+    print(f"📦 Prima del caricamento del modello: {format_memory(memory_usage())}")
+    app = preload_model()
+    print(f"📦 Dopo il caricamento del modello: {format_memory(memory_usage())}")
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((options.host, options.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    workers = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(app, sock, options)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        workers.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(options.workers):
+        spawn()
+    print(f"🚀 {options.workers} worker in ascolto su {options.host}:{options.port}")
+
+    # Riavvia i worker che terminano inaspettatamente
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} terminato (stato {status}), riavvio", file=sys.stderr)
+            time.sleep(1)
+            spawn()
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
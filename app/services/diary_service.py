@@ -1,20 +1,92 @@
+import asyncio
+import copy
+import threading
+import time
 from datetime import datetime, timezone
 from typing import List, Dict, Optional, Union
+from beanie import PydanticObjectId
 from beanie.operators import In
+from pymongo import UpdateOne
 
+from app.core.admission import AdmissionController, Overloaded, Priority
+from app.core.config import settings
+from app.core.metrics import Gauge, registry, sentiment_chunks, sentiment_stage_duration
 from app.models.diary import Diary
+from app.models.sentiment import SENTIMENT_LABELS, SENTIMENT_VERSION, encode_sentiment
 from app.models.user import User
 from transformers import pipeline, CamembertTokenizerFast
 
 # Inizializzazione del tokenizer e del modello di sentiment analysis
-tokenizer = CamembertTokenizerFast.from_pretrained("MilaNLProc/feel-it-italian-emotion")
+tokenizer = CamembertTokenizerFast.from_pretrained(settings.sentiment_model)
 emotion_pipeline = pipeline(
     "text-classification",
     tokenizer=tokenizer,
-    model="MilaNLProc/feel-it-italian-emotion",
+    model=settings.sentiment_model,
     top_k=None
 )
 
+# Il formato compatto dei sentiment salvati dipende dall'ordine delle etichette del modello
+_model_labels = emotion_pipeline.model.config.id2label
+if tuple(_model_labels[i].lower() for i in sorted(_model_labels)) != SENTIMENT_LABELS[SENTIMENT_VERSION]:
+    raise RuntimeError(
+        f"Le etichette del modello {settings.sentiment_model} non corrispondono "
+        f"a quelle del formato sentiment v{SENTIMENT_VERSION}"
+    )
+
+# Il tokenizer fast non è thread-safe: truncation e padding sono stato condiviso
+# del backend Rust, e la pipeline li modifica a ogni chiamata. Ogni thread di
+# inferenza usa quindi una propria copia del tokenizer, con una pipeline che
+# condivide il modello (e i suoi pesi) con quella globale.
+_thread_local = threading.local()
+
+
+def _thread_pipeline():
+    components = getattr(_thread_local, "components", None)
+    if components is None:
+        thread_tokenizer = copy.deepcopy(tokenizer)
+        components = _thread_local.components = (thread_tokenizer, pipeline(
+            "text-classification",
+            tokenizer=thread_tokenizer,
+            model=emotion_pipeline.model,
+            top_k=None
+        ))
+    return components
+
+
+# Parametri per la suddivisione in chunk dei testi lunghi
+MAX_TOKENS = 512
+CHUNK_MAX_LENGTH = 450
+CHUNK_STRIDE = 300
+
+# Numero di testi passati al modello in un singolo forward pass
+INFERENCE_BATCH_SIZE = 16
+
+# Numero di diari scritti su Mongo per ogni round trip durante l'import
+IMPORT_CHUNK_SIZE = 500
+
+# Tutte le inferenze passano dal controllo di ammissione
+inference_admission = AdmissionController(
+    max_in_flight=settings.inference_max_in_flight,
+    max_queued=settings.inference_max_queued,
+    queue_timeouts={
+        Priority.INTERACTIVE: settings.inference_queue_timeout_interactive_ms / 1000,
+        Priority.ADHOC: settings.inference_queue_timeout_adhoc_ms / 1000,
+        Priority.BACKFILL: settings.inference_queue_timeout_backfill_ms / 1000,
+    }
+)
+registry.register(Gauge(
+    "inference_admission_in_flight",
+    "Inferenze in esecuzione",
+    (),
+    lambda: [((), inference_admission.in_flight)]
+))
+registry.register(Gauge(
+    "inference_admission_queued",
+    "Inferenze in coda per classe di priorità",
+    ("priority",),
+    lambda: [((priority.name.lower(),), count) for priority, count in inference_admission.queued.items()]
+))
+
 
 async def create_diary_entry(user_id: str, title: str) -> Dict[str, str]:
     user = await User.get(user_id)
@@ -79,7 +151,7 @@ async def update_diary_entry(entry_id: str, entry_data: Dict) -> Optional[Diary]
     text = entry_data.get("text", diary.text)
     sentiment_result = None
     if text and text != diary.text:
-        sentiment_result = await sentiment_analysis(None, text)
+        sentiment_result = await sentiment_analysis(None, text, priority=Priority.INTERACTIVE)
 
     if "title" in entry_data:
         diary.title = entry_data["title"]
@@ -88,7 +160,7 @@ async def update_diary_entry(entry_id: str, entry_data: Dict) -> Optional[Diary]
 
     diary.updated_at = datetime.now(timezone.utc)
     if sentiment_result:
-        diary.sentiment = sentiment_result
+        diary.sentiment = encode_sentiment(sentiment_result)
 
     await diary.save()
     return diary
@@ -115,23 +187,184 @@ async def delete_diary_entry(entry_id: str) -> bool:
         return False
 
 
-async def sentiment_analysis(user: Optional[User], text: str) -> Dict:
+async def import_diary_entries(user_id: str, entries: List[Dict]) -> List[Diary]:
+    """
+    Importa in blocco una lista di diari per un utente.
+
+    L'utente viene letto una sola volta e i diari vengono inseriti con
+    insert_many a blocchi di IMPORT_CHUNK_SIZE documenti. L'import è tutto
+    o niente: se un blocco fallisce, i diari già inseriti vengono eliminati
+    prima di rilanciare l'errore.
+
+    Args:
+        user_id: L'ID dell'utente proprietario
+        entries: Lista di dizionari con title, text e created_at (opzionale)
+
+    Returns:
+        Lista dei diari inseriti, con l'ID assegnato dal database
+    """
+    user = await User.get(user_id)
+    if not user:
+        raise ValueError("Utente non trovato")
+
+    now = datetime.now(timezone.utc)
+    diaries = []
+    for entry in entries:
+        created_at = entry.get("created_at") or now
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        diaries.append(Diary(
+            # ID assegnato subito, per poter annullare anche un blocco inserito a metà
+            id=PydanticObjectId(),
+            title=entry["title"],
+            text=entry.get("text") or "",
+            user=user,
+            created_at=created_at,
+            updated_at=now,
+            sentiment=None
+        ))
+
+    try:
+        for start in range(0, len(diaries), IMPORT_CHUNK_SIZE):
+            await Diary.insert_many(diaries[start:start + IMPORT_CHUNK_SIZE])
+    except Exception:
+        try:
+            await Diary.find(In(Diary.id, [diary.id for diary in diaries])).delete()
+        except Exception as e:
+            print(f"Errore durante l'annullamento dell'import: {str(e)}")
+        raise
+
+    return diaries
+
+
+async def analyze_imported_entries(diaries: List[Diary]) -> None:
+    """
+    Calcola il sentiment dei diari importati e lo salva con bulk_write.
+
+    Pensata per essere eseguita in background dopo l'import: l'inferenza
+    avviene con priorità BACKFILL in blocchi da INFERENCE_BATCH_SIZE testi,
+    ognuno ammesso separatamente, così le richieste degli utenti possono
+    passare tra un blocco e l'altro; se il servizio è sovraccarico riprova.
+
+    Args:
+        diaries: Lista dei diari appena inseriti
+    """
+    pending = [diary for diary in diaries if diary.text]
+    collection = Diary.get_pymongo_collection()
+
+    for start in range(0, len(pending), IMPORT_CHUNK_SIZE):
+        chunk = pending[start:start + IMPORT_CHUNK_SIZE]
+        try:
+            results = await _analyze_backfill([diary.text for diary in chunk])
+            await collection.bulk_write(
+                [
+                    UpdateOne({"_id": diary.id}, {"$set": {"sentiment": encode_sentiment(result).dict()}})
+                    for diary, result in zip(chunk, results)
+                ],
+                ordered=False
+            )
+        except Exception as e:
+            print(f"Errore durante l'analisi dei diari importati: {str(e)}")
+
+
+async def _analyze_backfill(texts: List[str]) -> List[Dict]:
+    results = []
+    for start in range(0, len(texts), INFERENCE_BATCH_SIZE):
+        batch = texts[start:start + INFERENCE_BATCH_SIZE]
+        while True:
+            try:
+                results.extend(await inference_admission.run(Priority.BACKFILL, analyze_texts, batch))
+                break
+            except Overloaded as e:
+                await asyncio.sleep(e.retry_after)
+    return results
+
+
+async def sentiment_analysis(user: Optional[User], text: str,
+                             priority: Priority = Priority.ADHOC) -> Dict:
     """
     Analizza il sentiment di un testo, supportando testi più lunghi dividendoli in chunk.
 
     Args:
         user: Utente (opzionale)
         text: Testo da analizzare
+        priority: Classe di priorità per il controllo di ammissione
 
     Returns:
         Dizionario con i risultati dell'analisi del sentiment
+
+    Raises:
+        Overloaded: se l'inferenza è satura e la richiesta non può essere ammessa
+    """
+    results = await inference_admission.run(priority, analyze_texts, [text])
+    return results[0]
+
+
+def analyze_texts(texts: List[str]) -> List[Dict]:
+    """
+    Analizza il sentiment di più testi con un numero ridotto di forward pass.
+
+    I testi vengono tokenizzati insieme, quelli lunghi vengono divisi in chunk
+    e tutti i chunk vengono passati al modello in batch da INFERENCE_BATCH_SIZE.
+
+    Args:
+        texts: Testi da analizzare
+
+    Returns:
+        Lista di dizionari con i risultati, nello stesso ordine dei testi
     """
-    tokens = tokenizer.encode(text)
+    if not texts:
+        return []
+
+    thread_tokenizer, thread_pipeline = _thread_pipeline()
 
+    start = time.perf_counter()
+    all_tokens = thread_tokenizer(list(texts))["input_ids"]
+    tokenized = time.perf_counter()
+
+    # Raccoglie tutti i chunk ricordando a quale testo appartengono
+    chunks = []
+    owners = []
+    for index, (text, tokens) in enumerate(zip(texts, all_tokens)):
+        text_chunks = _split_in_chunks(thread_tokenizer, text, tokens)
+        sentiment_chunks.observe(len(text_chunks))
+        for chunk in text_chunks:
+            chunks.append(chunk)
+            owners.append(index)
+    chunked = time.perf_counter()
+
+    outputs = thread_pipeline(chunks, batch_size=INFERENCE_BATCH_SIZE, truncation=True)
+    forwarded = time.perf_counter()
+
+    grouped = [[] for _ in texts]
+    for index, output in zip(owners, outputs):
+        grouped[index].append(output)
+    results = [_combine_results(results) for results in grouped]
+    aggregated = time.perf_counter()
+
+    sentiment_stage_duration.observe(tokenized - start, "tokenize")
+    sentiment_stage_duration.observe(chunked - tokenized, "chunk")
+    sentiment_stage_duration.observe(forwarded - chunked, "forward")
+    sentiment_stage_duration.observe(aggregated - forwarded, "aggregate")
+    return results
+
+
+def _split_in_chunks(tokenizer, text: str, tokens: List[int]) -> List[str]:
     # Per testi brevi, analizza direttamente
-    if len(tokens) <= 512:
-        result = emotion_pipeline(text)
-        sentiments = result[0]
+    if len(tokens) <= MAX_TOKENS:
+        return [text]
+
+    # Per testi lunghi, dividi in chunk e analizza separatamente
+    chunks = []
+    for i in range(0, len(tokens), CHUNK_STRIDE):
+        chunk = tokens[i:i + CHUNK_MAX_LENGTH]
+        chunks.append(tokenizer.decode(chunk, skip_special_tokens=True))
+    return chunks
+
+
+def _combine_results(all_results: List[List[Dict]]) -> Dict:
+    if len(all_results) == 1:
+        sentiments = all_results[0]
         best = max(sentiments, key=lambda x: x['score'])
         return {
             "sentiment": best['label'],
@@ -139,22 +372,6 @@ async def sentiment_analysis(user: Optional[User], text: str) -> Dict:
             "sentiments": sentiments
         }
 
-    # Per testi lunghi, dividi in chunk e analizza separatamente
-    max_length = 450
-    stride = 300
-
-    chunks = []
-    for i in range(0, len(tokens), stride):
-        chunk = tokens[i:i + max_length]
-        chunk_text = tokenizer.decode(chunk, skip_special_tokens=True)
-        chunks.append(chunk_text)
-
-    # Analizza ciascun chunk
-    all_results = []
-    for chunk in chunks:
-        result = emotion_pipeline(chunk)
-        all_results.append(result[0])
-
     # Combina i risultati - media dei punteggi
     combined_sentiments = {}
     for results in all_results:
@@ -178,4 +395,4 @@ async def sentiment_analysis(user: Optional[User], text: str) -> Dict:
         "sentiment": best['label'],
         "score": best['score'],
         "sentiments": avg_sentiments
-    }
\ No newline at end of file
+    }
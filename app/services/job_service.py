@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from app.models.job import Job
+
+# Stati possibili di un job
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Limite ai raddoppi dell'attesa tra una ripresa e l'altra di un job
+MAX_BACKOFF_DOUBLINGS = 5
+
+
+async def create_job(job_type: str, params: Dict[str, Any]) -> Job:
+    """
+    Registra un nuovo job in background.
+
+    Args:
+        job_type: Tipo di job (es. "delete_user")
+        params: Parametri del job
+
+    Returns:
+        Il documento Job creato, in stato pending
+    """
+    now = datetime.now(timezone.utc)
+    job = Job(type=job_type, params=params, created_at=now, updated_at=now)
+    await job.insert()
+    return job
+
+
+async def get_job(job_id: str) -> Optional[Job]:
+    """
+    Recupera un job tramite il suo ID.
+
+    Args:
+        job_id: ID del job
+
+    Returns:
+        Il documento Job se trovato, altrimenti None
+    """
+    return await Job.get(job_id)
+
+
+async def update_job(job: Job, status: str, progress: Optional[Dict[str, Any]] = None,
+                     error: Optional[str] = None) -> None:
+    """
+    Aggiorna stato e avanzamento di un job.
+
+    Args:
+        job: Il job da aggiornare
+        status: Nuovo stato
+        progress: Contatori di avanzamento (opzionale)
+        error: Messaggio di errore se il job è fallito
+    """
+    now = datetime.now(timezone.utc)
+    update = {"status": status, "updated_at": now}
+    if progress is not None:
+        update["progress"] = progress
+    if error is not None:
+        update["error"] = error
+    elif status == COMPLETED:
+        update["error"] = None
+    if status in (COMPLETED, FAILED):
+        update["finished_at"] = now
+    await job.set(update)
+
+
+async def claim_stale_jobs(job_type: str, stale_after: float) -> List[Job]:
+    """
+    Prende in carico i job non terminati che non vengono aggiornati da
+    almeno stale_after secondi, ad esempio perché il worker che li eseguiva
+    è stato riavviato o perché l'ultima esecuzione è fallita.
+
+    L'attesa raddoppia a ogni ripresa (fino a MAX_BACKOFF_DOUBLINGS volte),
+    così un job che fallisce di continuo non viene rieseguito a raffica.
+    La presa in carico aggiorna updated_at e attempts con un'unica
+    update_one condizionata, così ogni job viene ripreso da un solo worker.
+
+    Args:
+        job_type: Tipo di job da riprendere
+        stale_after: Secondi senza aggiornamenti dopo cui un job è considerato interrotto
+
+    Returns:
+        Lista dei job presi in carico
+    """
+    now = datetime.now(timezone.utc)
+    stale = {
+        "type": job_type,
+        "status": {"$in": [PENDING, RUNNING]},
+        "updated_at": {"$lt": now - timedelta(seconds=stale_after)},
+    }
+    collection = Job.get_pymongo_collection()
+
+    claimed = []
+    for job in await Job.find(stale).to_list():
+        backoff = stale_after * 2 ** min(job.attempts, MAX_BACKOFF_DOUBLINGS)
+        result = await collection.update_one(
+            {**stale, "_id": job.id, "updated_at": {"$lt": now - timedelta(seconds=backoff)}},
+            {"$set": {"updated_at": now}, "$inc": {"attempts": 1}}
+        )
+        if result.modified_count:
+            job.updated_at = now
+            job.attempts += 1
+            claimed.append(job)
+    return claimed
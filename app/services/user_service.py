@@ -1,9 +1,19 @@
+import asyncio
 from typing import List, Optional, Dict, Any
+
+import numpy as np
+from bson import ObjectId
 from pydantic import EmailStr
+from pymongo import WriteConcern
 
+from app.core.config import settings
+from app.core.mongo_monitoring import pool_monitor
 from app.models.diary import Diary
+from app.models.job import Job
+from app.models.sentiment import SENTIMENT_LABELS, SENTIMENT_VERSION, sentiment_matrix
 from app.models.user import User
 from app.core.security import hash_password
+from app.services import job_service
 
 
 async def create_user(username: str, email: EmailStr, password: str) -> User:
@@ -92,25 +102,106 @@ async def update_user(user_id: str, data: Dict[str, Any]) -> Optional[User]:
     return user
 
 
-async def delete_user(user_id: str) -> bool:
+async def delete_user(user_id: str) -> Optional[Job]:
     """
     Elimina un utente dal sistema.
 
+    L'utente viene eliminato subito; i suoi diari vengono eliminati in
+    background da delete_user_diaries, tracciati dal job restituito.
+
     Args:
         user_id: ID dell'utente da eliminare
 
     Returns:
-        True se l'eliminazione è avvenuta con successo, False se l'utente non esiste
+        Il job di eliminazione dei diari, None se l'utente non esiste
     """
     try:
         user = await User.get(user_id)
         if not user:
-            return False
+            return None
+        job = await job_service.create_job("delete_user", {"user_id": str(user.id)})
         await user.delete()
-        return True
+        return job
     except Exception as e:
         print(f"Errore durante l'eliminazione dell'utente: {str(e)}")
-        return False
+        return None
+
+
+async def delete_user_diaries(job: Job) -> None:
+    """
+    Elimina a blocchi tutti i diari dell'utente di un job di eliminazione.
+
+    Può essere rieseguita su un job interrotto: riparte dai diari rimasti
+    ed elimina anche l'utente, se il job si era fermato prima di farlo.
+    In caso di errore il job resta running con l'errore registrato, così
+    resume_delete_user_jobs lo riprende più tardi.
+
+    I diari vengono letti in ordine di _id sull'indice (user.$id, _id) ed
+    eliminati con delete_many a blocchi di USER_DELETE_BATCH_SIZE. Tra un
+    blocco e l'altro il job si ferma, più a lungo se il pool di connessioni
+    è saturo, per non togliere risorse alle richieste degli utenti; le
+    scritture attendono la maggioranza del replica set così i secondari
+    non restano indietro.
+
+    Args:
+        job: Job creato da delete_user
+    """
+    user_id = ObjectId(job.params["user_id"])
+    collection = Diary.get_pymongo_collection().with_options(write_concern=WriteConcern(w="majority"))
+    batch_size = settings.user_delete_batch_size
+    pause = settings.user_delete_batch_pause_ms / 1000
+    deleted = job.progress.get("deleted_diaries", 0)
+    last_id = None
+
+    try:
+        await job_service.update_job(job, job_service.RUNNING, {"deleted_diaries": deleted})
+        await User.find(User.id == user_id).delete()
+        while True:
+            query = {"user.$id": user_id}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await collection.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size).to_list(None)
+            if not batch:
+                break
+
+            ids = [doc["_id"] for doc in batch]
+            result = await collection.delete_many({"_id": {"$in": ids}})
+            deleted += result.deleted_count
+            last_id = ids[-1]
+            await job_service.update_job(job, job_service.RUNNING, {"deleted_diaries": deleted})
+
+            # Pausa proporzionale al carico del pool
+            await asyncio.sleep(pause * (1 + 10 * pool_monitor.saturation()))
+
+        await job_service.update_job(job, job_service.COMPLETED, {"deleted_diaries": deleted})
+    except Exception as e:
+        print(f"Errore durante l'eliminazione dei diari dell'utente: {str(e)}")
+        # L'utente potrebbe essere già stato eliminato: segnare il job come
+        # fallito lascerebbe i diari rimasti senza modo di eliminarli
+        await job_service.update_job(job, job_service.RUNNING, {"deleted_diaries": deleted}, error=str(e))
+
+
+async def resume_delete_user_jobs() -> None:
+    """
+    Riprende periodicamente i job di eliminazione dei diari rimasti a metà,
+    ad esempio per un riavvio del worker che li eseguiva.
+
+    Un job è considerato interrotto se non viene aggiornato da più di
+    USER_DELETE_JOB_STALE_AFTER_MS, un tempo che raddoppia a ogni ripresa
+    dello stesso job; il controllo viene ripetuto ogni
+    USER_DELETE_JOB_CHECK_INTERVAL_MS finché il task non viene cancellato.
+    """
+    stale_after = settings.user_delete_job_stale_after_ms / 1000
+    interval = settings.user_delete_job_check_interval_ms / 1000
+
+    while True:
+        try:
+            for job in await job_service.claim_stale_jobs("delete_user", stale_after):
+                print(f"🔁 Ripresa del job di eliminazione {job.id}")
+                await delete_user_diaries(job)
+        except Exception as e:
+            print(f"Errore durante la ripresa dei job di eliminazione: {str(e)}")
+        await asyncio.sleep(interval)
 
 
 async def authenticate_user(email: EmailStr, password: str) -> Optional[User]:
@@ -159,12 +250,23 @@ async def search_users(search_term: str) -> List[User]:
 
     return users
 
+
+POSITIVE_LABELS = {"joy", "happiness", "positive", "surprise", "calm"}
+NEGATIVE_LABELS = {"sadness", "anger", "fear", "disgust", "negative"}
+
+# Polarità (1 positiva, 0 negativa, 0.5 neutra) di ogni etichetta del formato sentiment corrente
+LABEL_POLARITIES = np.array([
+    1.0 if label in POSITIVE_LABELS else 0.0 if label in NEGATIVE_LABELS else 0.5
+    for label in SENTIMENT_LABELS[SENTIMENT_VERSION]
+], dtype=np.float32)
+
+
 async def get_user_stats(user_id: str) -> List[float]:
     user = await User.get(user_id)
     if not user:
         return [0, 0, 0.0]
 
-    diaries = await Diary.find(Diary.user.id == user.id, fetch_links=True).sort("-created_at").to_list()
+    diaries = await Diary.find(Diary.user.id == user.id).sort("-created_at").to_list()
 
     # 1) numero totale di diari
     total_diaries = len(diaries)
@@ -188,39 +290,14 @@ async def get_user_stats(user_id: str) -> List[float]:
     if not last_10:
         mood = 0.5
     else:
-        positive_labels = {"joy", "happiness", "positive", "surprise", "calm"}
-        negative_labels = {"sadness", "anger", "fear", "disgust", "negative"}
-
-        weighted_sum = 0.0
-        score_sum = 0.0
-
-        for diary in last_10:
-            sentiment_data = diary.sentiment
-
-            if not sentiment_data or not isinstance(sentiment_data, dict):
-                continue
-
-            sentiments = sentiment_data.get("sentiments", [])
-            if not isinstance(sentiments, list):
-                continue
-
-            for item in sentiments[:3]:
-                if not isinstance(item, dict):
-                    continue
-
-                label = str(item.get("label", "")).lower()
-                score = float(item.get("score", 0.0))
-
-                if label in positive_labels:
-                    polarity = 1.0
-                elif label in negative_labels:
-                    polarity = 0.0
-                else:
-                    polarity = 0.5
+        scores = sentiment_matrix([d.sentiment for d in last_10])
 
-                weighted_sum += score * polarity
-                score_sum += score
+        # Primi 3 sentiment di ogni diario e relativa polarità
+        top_3 = np.argsort(-scores, axis=1, kind="stable")[:, :3]
+        top_scores = np.take_along_axis(scores, top_3, axis=1)
+        polarities = LABEL_POLARITIES[top_3]
 
-        mood = (weighted_sum / score_sum) if score_sum > 0 else 0.5
+        score_sum = float(top_scores.sum())
+        mood = float((top_scores * polarities).sum()) / score_sum if score_sum > 0 else 0.5
 
     return [total_diaries, streak, mood]
\ No newline at end of file
@@ -0,0 +1,268 @@
+"""
+Micro-benchmark del percorso di inferenza (diary_service.analyze_texts).
+
+Misura come scala l'analisi del sentiment al variare della lunghezza del
+testo, dei parametri di chunking (max_length/stride) e della dimensione del
+batch passato al modello. Per ogni combinazione riporta token/s, tempo per
+fase (tokenize, chunk, forward, aggregate, letti dalle metriche dell'app)
+e RSS di picco durante il caso.
+
+Senza --model-dir viene creato in una cartella temporanea un modello
+Camembert piccolo con pesi casuali e un tokenizer addestrato su testo
+sintetico, così il benchmark funziona offline. Con --model-dir si può usare
+il modello reale già scaricato in locale.
+
+Esempi:
+    python -m benchmarks.inference --lengths 50,500,5000 --batch-sizes 1,16
+    python -m benchmarks.inference --model-dir ./feel-it --profile inference.prof
+    py-spy record -o inference.svg -- python -m benchmarks.inference
+
+Richiede torch, transformers e tokenizers oltre alle dipendenze dell'app.
+"""
+import argparse
+import contextlib
+import cProfile
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+STAGES = ("tokenize", "chunk", "forward", "aggregate")
+
+EMOTION_LABELS = ("anger", "fear", "joy", "sadness")
+
+WORDS = (
+    "oggi sono andato al lavoro e ho incontrato un vecchio amico mi sento felice "
+    "stanco arrabbiato triste sereno preoccupato la giornata è stata lunga ma "
+    "bella domani vorrei riposare un po' di più e passare del tempo con la famiglia "
+    "ho paura dell'esame sono contento della notizia che mi ha dato mia sorella"
+).split()
+
+
+def int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss è in KB su Linux ed è il picco dall'avvio del processo
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def reset_peak_rss() -> bool:
+    """
+    Azzera il picco di RSS del processo (VmHWM), così quello letto dopo
+    riguarda solo il caso misurato. False se il kernel non lo consente.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def case_peak_rss_mb() -> Optional[float]:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def build_random_model(path: str, vocab_size: int, hidden_size: int, layers: int):
+    """
+    Salva in ``path`` un modello Camembert con pesi casuali e un tokenizer
+    Unigram (come SentencePiece) addestrato su testo sintetico, compatibili
+    con CamembertTokenizerFast.
+    """
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors, trainers
+    from transformers import CamembertConfig, CamembertForSequenceClassification, CamembertTokenizerFast
+
+    special_tokens = ["<s>", "<pad>", "</s>", "<unk>", "<mask>"]
+    unigram = Tokenizer(models.Unigram())
+    unigram.pre_tokenizer = pre_tokenizers.Metaspace()
+    rng = random.Random(0)
+    corpus = (" ".join(rng.choice(WORDS) for _ in range(50)) for _ in range(2000))
+    unigram.train_from_iterator(corpus, trainers.UnigramTrainer(
+        vocab_size=vocab_size, special_tokens=special_tokens, unk_token="<unk>"
+    ))
+    unigram.post_processor = processors.RobertaProcessing(
+        ("</s>", unigram.token_to_id("</s>")), ("<s>", unigram.token_to_id("<s>"))
+    )
+
+    tokenizer = CamembertTokenizerFast(
+        tokenizer_object=unigram,
+        bos_token="<s>", eos_token="</s>", sep_token="</s>", cls_token="<s>",
+        unk_token="<unk>", pad_token="<pad>", mask_token="<mask>",
+        model_max_length=512
+    )
+    config = CamembertConfig(
+        vocab_size=unigram.get_vocab_size(),
+        hidden_size=hidden_size,
+        num_hidden_layers=layers,
+        num_attention_heads=max(1, hidden_size // 64),
+        intermediate_size=hidden_size * 4,
+        max_position_embeddings=514,
+        pad_token_id=tokenizer.pad_token_id,
+        bos_token_id=tokenizer.bos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        id2label=dict(enumerate(EMOTION_LABELS)),
+        label2id={label: i for i, label in enumerate(EMOTION_LABELS)},
+    )
+    model = CamembertForSequenceClassification(config)
+    model.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+
+
+def make_text(tokenizer, rng: random.Random, target_tokens: int) -> str:
+    """
+    Genera un testo di circa ``target_tokens`` token con il tokenizer dato.
+    """
+    text = " ".join(rng.choice(WORDS) for _ in range(target_tokens))
+    while len(tokenizer.encode(text)) < target_tokens:
+        text += " " + " ".join(rng.choice(WORDS) for _ in range(target_tokens))
+    # Tronca ai primi token (esclusi quelli speciali) e ricostruisce il testo
+    ids = tokenizer.encode(text)[1:target_tokens - 1]
+    return tokenizer.decode(ids, skip_special_tokens=True)
+
+
+def stage_totals(histogram) -> Dict[str, float]:
+    return {stage: histogram.totals(stage)[1] for stage in STAGES}
+
+
+def run_case(diary_service, histogram, texts: List[str], repeats: int, warmup: int) -> Dict:
+    tokens = sum(len(tokens) for tokens in diary_service.tokenizer(texts)["input_ids"])
+
+    peak_reset = reset_peak_rss()
+    for _ in range(warmup):
+        diary_service.analyze_texts(texts)
+
+    before = stage_totals(histogram)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        diary_service.analyze_texts(texts)
+    elapsed = (time.perf_counter() - start) / repeats
+    after = stage_totals(histogram)
+
+    return {
+        "tokens": tokens,
+        "seconds": elapsed,
+        "tokens_per_s": tokens / elapsed if elapsed else 0.0,
+        "stages_ms": {stage: (after[stage] - before[stage]) / repeats * 1000 for stage in STAGES},
+        "rss_mb": current_rss_mb(),
+        "peak_rss_mb": case_peak_rss_mb() if peak_reset else None,
+    }
+
+
+def run(options) -> Dict:
+    import torch
+
+    if options.threads:
+        torch.set_num_threads(options.threads)
+
+    from app.core.metrics import sentiment_stage_duration
+    from app.services import diary_service
+
+    rng = random.Random(options.seed)
+    texts_by_length = {
+        length: [make_text(diary_service.tokenizer, rng, length) for _ in range(options.texts_per_call)]
+        for length in options.lengths
+    }
+
+    # Il reset di VmHWM abbassa anche ru_maxrss: il picco globale va tenuto a parte
+    peak = peak_rss_mb()
+    results = []
+    for length, texts in texts_by_length.items():
+        for max_length in options.max_lengths:
+            for stride in options.strides:
+                if stride > max_length:
+                    continue
+                for batch_size in options.batch_sizes:
+                    diary_service.CHUNK_MAX_LENGTH = max_length
+                    diary_service.CHUNK_STRIDE = stride
+                    diary_service.INFERENCE_BATCH_SIZE = batch_size
+                    case = run_case(diary_service, sentiment_stage_duration, texts, options.repeats, options.warmup)
+                    case.update({
+                        "target_tokens": length,
+                        "texts": len(texts),
+                        "max_length": max_length,
+                        "stride": stride,
+                        "batch_size": batch_size,
+                    })
+                    results.append(case)
+                    peak = max(peak, case["peak_rss_mb"] or 0.0, peak_rss_mb())
+                    print(
+                        f"len={length} max_length={max_length} stride={stride} batch={batch_size}: "
+                        f"{case['tokens_per_s']:.0f} tok/s",
+                        file=sys.stderr
+                    )
+
+    return {
+        "config": {
+            "model": diary_service.settings.sentiment_model,
+            "torch_threads": torch.get_num_threads(),
+            "repeats": options.repeats,
+            "warmup": options.warmup,
+            "seed": options.seed,
+        },
+        "results": results,
+        "peak_rss_mb": max(peak, peak_rss_mb()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark dell'analisi del sentiment")
+    parser.add_argument("--model-dir", default=None,
+                        help="Modello locale da usare (default: modello casuale in una cartella temporanea)")
+    parser.add_argument("--lengths", type=int_list, default=int_list("50,200,500,1000,2000,5000,10000"),
+                        help="Lunghezze dei testi in token")
+    parser.add_argument("--max-lengths", type=int_list, default=int_list("450"))
+    parser.add_argument("--strides", type=int_list, default=int_list("300"))
+    parser.add_argument("--batch-sizes", type=int_list, default=int_list("1,8,16"))
+    parser.add_argument("--texts-per-call", type=int, default=1,
+                        help="Numero di testi analizzati in una singola chiamata")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=0, help="Thread di torch (default: quelli di torch)")
+    parser.add_argument("--hidden-size", type=int, default=128, help="Dimensione del modello casuale")
+    parser.add_argument("--layers", type=int, default=2, help="Layer del modello casuale")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--profile", default=None, help="Salva il profilo cProfile (pstats) in questo file")
+    parser.add_argument("--output", default=None, help="File JSON di output (default: stdout)")
+    options = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        model_dir = options.model_dir
+        if model_dir is None:
+            model_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="diaryai-model-"))
+            build_random_model(model_dir, vocab_size=8000, hidden_size=options.hidden_size, layers=options.layers)
+        os.environ["SENTIMENT_MODEL"] = model_dir
+
+        profiler = cProfile.Profile() if options.profile else None
+        if profiler:
+            profiler.enable()
+        report = run(options)
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(options.profile)
+
+    output = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
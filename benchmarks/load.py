@@ -0,0 +1,277 @@
+"""
+Benchmark di carico end-to-end dell'API.
+
+Avvia l'app FastAPI nello stesso processo (httpx + ASGITransport) usando
+Mongo in memoria e un modello di emozioni finto con latenza configurabile,
+poi esegue un mix di operazioni realistico con N utenti virtuali concorrenti.
+Il risultato (throughput e p50/p95/p99 per endpoint) viene scritto in JSON.
+
+Poiché client e app condividono lo stesso event loop, ogni chiamata bloccante
+nell'app (es. inferenza eseguita nel loop) si vede subito come aumento delle
+latenze di tutti gli endpoint.
+
+Esempio:
+    python -m benchmarks.load --concurrency 32 --duration 30 --model-latency-ms 40
+
+Richiede httpx e mongomock oltre alle dipendenze dell'app.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.standins import InMemoryMongoClient, install_fake_transformers
+
+DEFAULT_MIX = "create=2,update=4,get=3,list=3,stats=2,sentiment=1,login=1"
+
+WORDS = (
+    "oggi sono andato al lavoro e ho incontrato un vecchio amico mi sento felice "
+    "stanco arrabbiato triste sereno preoccupato la giornata è stata lunga ma "
+    "bella domani vorrei riposare un po' di più e passare del tempo con la famiglia"
+).split()
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = int(weight or 1)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Operazioni sconosciute: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+    return samples[index]
+
+
+def random_text(rng: random.Random, min_words: int, max_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.shed: Dict[str, int] = {}
+
+    def record(self, name: str, elapsed: float, ok: bool, shed: bool = False):
+        # Le richieste rifiutate con 503 non entrano nei percentili
+        if shed:
+            self.shed[name] = self.shed.get(name, 0) + 1
+            return
+        self.latencies.setdefault(name, []).append(elapsed)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, duration: float) -> Dict:
+        endpoints = {}
+        for name in sorted(set(self.latencies) | set(self.shed)):
+            samples = sorted(self.latencies.get(name, []))
+            endpoints[name] = {
+                "count": len(samples),
+                "errors": self.errors.get(name, 0),
+                "shed": self.shed.get(name, 0),
+                "throughput_rps": len(samples) / duration if duration else 0.0,
+                # Senza richieste ammesse non ci sono latenze da riportare
+                "mean_ms": sum(samples) / len(samples) * 1000 if samples else None,
+                "p50_ms": percentile(samples, 0.50) * 1000 if samples else None,
+                "p95_ms": percentile(samples, 0.95) * 1000 if samples else None,
+                "p99_ms": percentile(samples, 0.99) * 1000 if samples else None,
+                "max_ms": samples[-1] * 1000 if samples else None,
+            }
+        total = sum(e["count"] for e in endpoints.values())
+        return {
+            "duration_s": duration,
+            "total_requests": total,
+            "total_errors": sum(self.errors.values()),
+            "total_shed": sum(self.shed.values()),
+            "throughput_rps": total / duration if duration else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+class VirtualUser:
+    def __init__(self, client, recorder: Recorder, rng: random.Random, index: int, options):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.options = options
+        self.email = f"bench{index}@example.com"
+        self.password = f"password-{index}"
+        self.user_id: Optional[str] = None
+        self.diary_ids: List[str] = []
+
+    async def request(self, name: str, method: str, url: str, expected: int = 200, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code == expected
+        except Exception:
+            response, ok = None, False
+        shed = response is not None and response.status_code == 503
+        self.recorder.record(name, time.perf_counter() - start, ok, shed)
+        if shed:
+            # Come un client reale, rispetta Retry-After prima della prossima richiesta
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+        return response if ok else None
+
+    def text(self) -> str:
+        return random_text(self.rng, self.options.min_words, self.options.max_words)
+
+    async def register(self):
+        response = await self.request(
+            "POST /users/register", "POST", "/users/register", expected=201,
+            json={"username": self.email.split("@")[0], "email": self.email, "password": self.password}
+        )
+        if response is not None:
+            self.user_id = response.json()["id"]
+
+    async def login(self):
+        await self.request(
+            "POST /users/login", "POST", "/users/login",
+            json={"email": self.email, "password": self.password}
+        )
+
+    async def create(self):
+        response = await self.request(
+            "POST /diaries/", "POST", "/diaries/", expected=201,
+            json={"user_id": self.user_id, "title": f"Diario {len(self.diary_ids) + 1}"}
+        )
+        if response is not None:
+            self.diary_ids.append(response.json()["id"])
+
+    async def update(self):
+        if not self.diary_ids:
+            await self.create()
+            return
+        entry_id = self.rng.choice(self.diary_ids)
+        await self.request(
+            "PUT /diaries/{entry_id}", "PUT", f"/diaries/{entry_id}",
+            json={"text": self.text()}
+        )
+
+    async def get(self):
+        if not self.diary_ids:
+            await self.create()
+            return
+        entry_id = self.rng.choice(self.diary_ids)
+        await self.request("GET /diaries/{entry_id}", "GET", f"/diaries/{entry_id}")
+
+    async def list(self):
+        await self.request("GET /diaries/user/{user_id}", "GET", f"/diaries/user/{self.user_id}")
+
+    async def stats(self):
+        await self.request("GET /users/{user_id}/stats", "GET", f"/users/{self.user_id}/stats")
+
+    async def sentiment(self):
+        await self.request("POST /diaries/sentiment", "POST", "/diaries/sentiment", params={"text": self.text()})
+
+
+OPERATIONS = ("create", "update", "get", "list", "stats", "sentiment", "login")
+
+
+async def run_user(user: VirtualUser, mix: Dict[str, int], deadline: float, max_requests: Optional[int]):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    done = 0
+    while time.perf_counter() < deadline and (max_requests is None or done < max_requests):
+        await getattr(user, user.rng.choices(names, weights)[0])()
+        done += 1
+
+
+async def run(options) -> Dict:
+    from app.main import app
+    import httpx
+
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            users = [
+                VirtualUser(client, recorder, random.Random(options.seed + i), i, options)
+                for i in range(options.concurrency)
+            ]
+
+            # Preparazione: ogni utente si registra e crea il primo diario
+            setup_start = time.perf_counter()
+            await asyncio.gather(*(user.register() for user in users))
+            await asyncio.gather(*(user.create() for user in users if user.user_id))
+            setup = recorder.report(time.perf_counter() - setup_start)
+            recorder = Recorder()
+            for user in users:
+                user.recorder = recorder
+
+            start = time.perf_counter()
+            deadline = start + options.duration
+            await asyncio.gather(*(
+                run_user(user, options.mix, deadline, options.requests)
+                for user in users if user.user_id
+            ))
+            elapsed = time.perf_counter() - start
+
+    report = recorder.report(elapsed)
+    report["setup"] = setup
+    report["config"] = {
+        "concurrency": options.concurrency,
+        "duration_s": options.duration,
+        "requests_per_user": options.requests,
+        "mix": options.mix,
+        "model_latency_ms": options.model_latency_ms,
+        "db_latency_ms": options.db_latency_ms,
+        "mongo_uri": options.mongo_uri or "memory",
+        "seed": options.seed,
+    }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark di carico end-to-end di DiaryAI")
+    parser.add_argument("--concurrency", type=int, default=16, help="Utenti virtuali concorrenti")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durata della fase di misura (s)")
+    parser.add_argument("--requests", type=int, default=None, help="Numero massimo di richieste per utente")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Pesi delle operazioni (default: {DEFAULT_MIX})")
+    parser.add_argument("--model-latency-ms", type=float, default=20.0,
+                        help="Latenza del modello finto per ogni batch")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0,
+                        help="Latenza simulata per ogni round trip verso Mongo in memoria")
+    parser.add_argument("--mongo-uri", default=None,
+                        help="Usa un Mongo reale invece di quello in memoria")
+    parser.add_argument("--min-words", type=int, default=20)
+    parser.add_argument("--max-words", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default=None, help="File JSON di output (default: stdout)")
+    options = parser.parse_args(argv)
+
+    install_fake_transformers(options.model_latency_ms / 1000)
+    if options.mongo_uri:
+        os.environ["MONGO_URI"] = options.mongo_uri
+        os.environ.setdefault("MONGO_DB_NAME", "DiaryAI_bench")
+    else:
+        import app.db
+        latency = options.db_latency_ms / 1000
+        app.db.AsyncMongoClient = lambda *args, **kwargs: InMemoryMongoClient(latency=latency)
+
+    # I messaggi stampati dall'app non devono finire nel JSON su stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run(options))
+    output = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
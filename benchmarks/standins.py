@@ -0,0 +1,249 @@
+"""
+Sostituti locali per eseguire i benchmark senza Mongo e senza scaricare il modello.
+
+- install_fake_transformers: registra un modulo ``transformers`` finto con un
+  tokenizer a parole e un modello di emozioni deterministico, con latenza
+  configurabile per forward pass. Va chiamata prima di importare ``app``.
+- InMemoryMongoClient: adatta mongomock all'interfaccia asincrona di
+  AsyncMongoClient usata da beanie, con latenza opzionale per operazione.
+"""
+import asyncio
+import inspect
+import itertools
+import sys
+import time
+import types
+import zlib
+from typing import Dict, List
+
+import mongomock
+from bson import DBRef
+from mongomock import filtering as mongomock_filtering
+from mongomock import helpers as mongomock_helpers
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult
+
+EMOTION_LABELS = ("anger", "fear", "joy", "sadness")
+
+
+# Modello finto
+
+class FakeTokenizer:
+    """
+    Tokenizer a parole: ogni parola è un token, più i token speciali di inizio e fine.
+    """
+
+    bos_token_id = 0
+    eos_token_id = 2
+
+    @classmethod
+    def from_pretrained(cls, *args, **kwargs):
+        return cls()
+
+    def encode(self, text: str) -> List[int]:
+        ids = [3 + zlib.crc32(word.encode()) % 32000 for word in text.split()]
+        return [self.bos_token_id] + ids + [self.eos_token_id]
+
+    def __call__(self, texts, **kwargs) -> Dict[str, List[List[int]]]:
+        if isinstance(texts, str):
+            return {"input_ids": self.encode(texts)}
+        return {"input_ids": [self.encode(text) for text in texts]}
+
+    def decode(self, ids: List[int], skip_special_tokens: bool = False) -> str:
+        return " ".join(
+            f"w{token}" for token in ids
+            if not (skip_special_tokens and token in (self.bos_token_id, self.eos_token_id))
+        )
+
+
+class FakeEmotionPipeline:
+    """
+    Pipeline di text-classification deterministica: i punteggi dipendono solo
+    dal testo. Ogni batch di ``batch_size`` testi blocca il thread per
+    ``latency`` secondi, come farebbe il forward pass del modello reale.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.model = types.SimpleNamespace(config=types.SimpleNamespace(
+            id2label=dict(enumerate(EMOTION_LABELS)),
+            label2id={label: i for i, label in enumerate(EMOTION_LABELS)},
+        ))
+
+    def _classify(self, text: str) -> List[Dict]:
+        seed = zlib.crc32(text.encode())
+        raw = [((seed >> (8 * i)) & 0xFF) + 1 for i in range(len(EMOTION_LABELS))]
+        total = sum(raw)
+        scores = [{"label": label, "score": value / total} for label, value in zip(EMOTION_LABELS, raw)]
+        return sorted(scores, key=lambda x: x["score"], reverse=True)
+
+    def __call__(self, inputs, batch_size: int = 1, **kwargs):
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        batches = max(1, -(-len(texts) // max(1, batch_size)))
+        if self.latency:
+            time.sleep(self.latency * batches)
+        # Con top_k impostato la pipeline reale restituisce una lista di punteggi per ogni testo
+        return [self._classify(text) for text in texts]
+
+
+def install_fake_transformers(latency: float = 0.0) -> FakeEmotionPipeline:
+    """
+    Registra in sys.modules un modulo ``transformers`` con tokenizer e
+    pipeline finti. Restituisce la pipeline per poterne cambiare la latenza.
+    """
+    emotion_pipeline = FakeEmotionPipeline(latency)
+    module = types.ModuleType("transformers")
+    module.CamembertTokenizerFast = FakeTokenizer
+    module.pipeline = lambda *args, **kwargs: emotion_pipeline
+    sys.modules["transformers"] = module
+    return emotion_pipeline
+
+
+# Mongo in memoria
+
+def _as_document(value):
+    if isinstance(value, DBRef):
+        return value.as_doc().to_dict()
+    if isinstance(value, dict) and any(isinstance(v, DBRef) for v in value.values()):
+        return {k: _as_document(v) for k, v in value.items()}
+    return value
+
+
+_iter_key_candidates = mongomock_filtering.iter_key_candidates
+_get_value_by_dot = mongomock_helpers.get_value_by_dot
+
+
+def _iter_key_candidates_dbref(key, doc):
+    return _iter_key_candidates(key, _as_document(doc))
+
+
+def _get_value_by_dot_dbref(doc, key, can_generate_array=False):
+    return _get_value_by_dot(_as_document(doc), key, can_generate_array)
+
+
+# mongomock non attraversa i DBRef nei path puntati ("user.$id"),
+# che beanie usa sia nelle query sui Link sia nei $lookup di fetch_links
+mongomock_filtering.iter_key_candidates = _iter_key_candidates_dbref
+mongomock_helpers.get_value_by_dot = _get_value_by_dot_dbref
+
+_WRAPPED_TYPES = (
+    mongomock.MongoClient,
+    mongomock.database.Database,
+    mongomock.collection.Collection,
+    mongomock.collection.Cursor,
+    mongomock.command_cursor.CommandCursor,
+)
+
+
+class _Pending:
+    """
+    Risultato di una chiamata: awaitable come nel driver asincrono, ma usabile
+    anche direttamente (es. ``find(...).sort(...)``) come un cursore.
+    """
+
+    def __init__(self, value, latency: float):
+        self._value = value
+        self._latency = latency
+
+    def __await__(self):
+        if self._latency:
+            yield from asyncio.sleep(self._latency).__await__()
+        return _wrap(self._value, self._latency)
+
+    def __getattr__(self, name):
+        return getattr(_wrap(self._value, self._latency), name)
+
+    def __aiter__(self):
+        return _wrap(self._value, self._latency).__aiter__()
+
+
+def _wrap(value, latency: float):
+    if isinstance(value, _WRAPPED_TYPES):
+        return _AsyncProxy(value, latency)
+    return value
+
+
+class _AsyncProxy:
+    def __init__(self, target, latency: float):
+        self._target = target
+        self._latency = latency
+
+    def __getitem__(self, key):
+        return _wrap(self._target[key], self._latency)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self._target:
+            yield document
+
+    async def to_list(self, length=None):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        if length:
+            return list(itertools.islice(self._target, length))
+        return list(self._target)
+
+    async def close(self):
+        pass
+
+    async def command(self, command, *args, **kwargs):
+        if "buildInfo" in command:
+            return {"version": "7.0.0", "versionArray": [7, 0, 0, 0], "ok": 1.0}
+        return {"ok": 1.0}
+
+    async def bulk_write(self, requests, ordered=True, **kwargs):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        collection = self._target
+        counts = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0}
+        for request in requests:
+            if isinstance(request, InsertOne):
+                collection.insert_one(request._doc)
+                counts["nInserted"] += 1
+            elif isinstance(request, (UpdateOne, UpdateMany)):
+                update = collection.update_one if isinstance(request, UpdateOne) else collection.update_many
+                result = update(request._filter, request._doc, upsert=request._upsert)
+                counts["nMatched"] += result.matched_count
+                counts["nModified"] += result.modified_count
+                counts["nUpserted"] += int(result.upserted_id is not None)
+            elif isinstance(request, ReplaceOne):
+                result = collection.replace_one(request._filter, request._doc, upsert=request._upsert)
+                counts["nMatched"] += result.matched_count
+                counts["nModified"] += result.modified_count
+            elif isinstance(request, (DeleteOne, DeleteMany)):
+                delete = collection.delete_one if isinstance(request, DeleteOne) else collection.delete_many
+                counts["nRemoved"] += delete(request._filter).deleted_count
+        return BulkWriteResult({**counts, "upserted": []}, acknowledged=True)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return _wrap(attribute, self._latency)
+
+        # mongomock non accetta tutti i parametri del driver (es. authorizedCollections)
+        try:
+            parameters = inspect.signature(attribute).parameters
+        except (TypeError, ValueError):
+            parameters = {}
+        accepts_any = any(p.kind is p.VAR_KEYWORD for p in parameters.values())
+
+        def call(*args, **kwargs):
+            if not accepts_any:
+                kwargs = {k: v for k, v in kwargs.items() if k in parameters}
+            return _Pending(attribute(*args, **kwargs), self._latency)
+
+        return call
+
+
+class InMemoryMongoClient(_AsyncProxy):
+    """
+    Sostituto di AsyncMongoClient basato su mongomock.
+
+    Args:
+        latency: Secondi di attesa simulati per ogni round trip
+    """
+
+    def __init__(self, *args, latency: float = 0.0, **kwargs):
+        super().__init__(mongomock.MongoClient(), latency)